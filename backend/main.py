@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
@@ -8,9 +9,34 @@ import bcrypt
 import os
 from datetime import datetime, timedelta
 
+try:
+    from backend.rate_limit import RateLimitMiddleware
+except ImportError:  # launched from inside backend/
+    from rate_limit import RateLimitMiddleware
+
 app = FastAPI(title="District Administration API", version="1.0.0")
 
-# CORS middleware
+# JWT settings
+SECRET_KEY = os.getenv("SECRET_KEY", "district-admin-secret-key")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+security = HTTPBearer()
+
+def token_principal(request: Request) -> Optional[str]:
+    # Rate-limit key for authenticated callers; invalid tokens fall back to per-IP limits
+    auth = request.headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(auth[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except jwt.PyJWTError:
+        return None
+
+# Rate limiting and admission control for expensive routes
+app.add_middleware(RateLimitMiddleware, principal_func=token_principal)
+
+# CORS middleware (added last so it also wraps 429 responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -24,13 +50,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# JWT settings
-SECRET_KEY = os.getenv("SECRET_KEY", "district-admin-secret-key")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-security = HTTPBearer()
-
 # Pydantic Models
 class LoginRequest(BaseModel):
     username: str
@@ -50,11 +69,13 @@ class LoginResponse(BaseModel):
     user: UserResponse
 
 # Mock database
+# Password hashes are precomputed so importing this module does not pay for
+# three bcrypt rounds on every worker boot.
 MOCK_USERS = {
     "admin": {
         "id": "1",
         "username": "admin",
-        "password": bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8'),
+        "password": "$2b$12$O4/pcnijsTdB1b2twQSb6OH6XxDnLhD2GTVq9Pw8hlT/C1UBKkORK",  # admin123
         "full_name": "System Administrator",
         "email": "admin@district.gov",
         "role": "administrator",
@@ -63,7 +84,7 @@ MOCK_USERS = {
     "dept_head": {
         "id": "2",
         "username": "dept_head",
-        "password": bcrypt.hashpw("dept123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8'),
+        "password": "$2b$12$X7OQGIkEf9RN8x2Y4.IrCuaR465kx1QtVS6JQi7P6Omg3TctsVwc.",  # dept123
         "full_name": "Department Head",
         "email": "head@district.gov",
         "role": "department_head",
@@ -72,7 +93,7 @@ MOCK_USERS = {
     "staff": {
         "id": "3",
         "username": "staff",
-        "password": bcrypt.hashpw("staff123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8'),
+        "password": "$2b$12$MDQ8ibPbnQ2yQGlVjStSxebQnMLwqhIN4YS7N2AaszvMidky1/vIS",  # staff123
         "full_name": "Staff Member",
         "email": "staff@district.gov",
         "role": "staff",
@@ -110,7 +131,8 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
 @app.post("/auth/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest):
     user = MOCK_USERS.get(login_data.username)
-    if not user or not verify_password(login_data.password, user["password"]):
+    # bcrypt is CPU-bound; keep it off the event loop so cheap routes stay responsive
+    if not user or not await run_in_threadpool(verify_password, login_data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -175,4 +197,5 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # reload needs an import string; backend/ is on sys.path when run as a script
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,234 @@
+"""Rate limiting and admission control middleware.
+
+Requests are sorted into route classes by path prefix. Each class has a
+token bucket per client IP and per principal, plus a cap on concurrently
+executing requests. When the cap is reached, requests wait in a bounded
+queue; once the queue is full they are shed with 429 and Retry-After.
+Paths that match no class (e.g. /tasks) are passed straight to the app.
+"""
+import asyncio
+import json
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+MAX_BODY_BYTES = 64 * 1024
+
+@dataclass
+class RouteClass:
+    name: str
+    prefixes: Tuple[str, ...]
+    rate: float            # tokens refilled per second
+    burst: int             # bucket capacity
+    max_concurrency: int   # requests executing at once
+    max_queue: int         # requests waiting for a slot before shedding
+    queue_timeout: float = 5.0
+    # JSON body field (e.g. username) limited across all client IPs. Keep it
+    # much looser than rate/burst: a global limit as tight as the per-IP one
+    # would let anyone lock an account out from a single address.
+    body_field: Optional[str] = None
+    field_rate: float = 0.0
+    field_burst: int = 0
+
+DEFAULT_ROUTE_CLASSES = [
+    RouteClass(name="login", prefixes=("/auth/login",), rate=0.2, burst=5,
+               max_concurrency=4, max_queue=8,
+               body_field="username", field_rate=2.0, field_burst=50),
+    RouteClass(name="analytics", prefixes=("/analytics",), rate=1.0, burst=10,
+               max_concurrency=4, max_queue=16),
+]
+
+# (key, tokens refilled per second, bucket capacity)
+Limit = Tuple[str, float, int]
+
+class BucketStore(ABC):
+    """Storage backend for token buckets.
+
+    Subclass this to share limits across workers (e.g. Redis). ``consume``
+    takes one token from every bucket in ``limits`` only if all of them have
+    a token, and returns 0 in that case. Otherwise nothing is charged and it
+    returns the number of seconds until every bucket has a token.
+
+    The check and the charge must be atomic across all keys and all workers:
+    two concurrent calls must never both spend the last token of a bucket,
+    and a rejected call must leave every bucket unchanged. With Redis this
+    means a single Lua script (or MULTI/WATCH transaction) per call, using
+    the server clock for refill.
+    """
+
+    @abstractmethod
+    async def consume(self, limits: List[Limit]) -> float:
+        ...
+
+class InMemoryBucketStore(BucketStore):
+    """Per-process bucket store. Limits are not shared between workers.
+
+    Holds at most ``max_keys`` buckets, evicting the least recently used.
+    """
+
+    def __init__(self, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def consume(self, limits: List[Limit]) -> float:
+        now = self.clock()
+        with self._lock:
+            levels = {}
+            waits = []
+            for key, rate, capacity in limits:
+                tokens, updated = self._buckets.get(key, (float(capacity), now))
+                levels[key] = min(float(capacity), tokens + (now - updated) * rate)
+                if levels[key] < 1:
+                    waits.append((1 - levels[key]) / rate)
+            # Charge only when every bucket allows the request
+            wait = max(waits, default=0.0)
+            for key, tokens in levels.items():
+                self._buckets[key] = (tokens if wait else tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+class _Admission:
+    """Concurrency cap with a bounded wait queue."""
+
+    def __init__(self, route_class: RouteClass):
+        self.route_class = route_class
+        self.semaphore = asyncio.Semaphore(route_class.max_concurrency)
+        self.waiting = 0
+
+    async def acquire(self) -> bool:
+        if self.semaphore.locked():
+            if self.waiting >= self.route_class.max_queue:
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.route_class.queue_timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+            return True
+        await self.semaphore.acquire()
+        return True
+
+    def release(self):
+        self.semaphore.release()
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+def too_many_requests(retry_after: float, detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+class _ClientDisconnect(Exception):
+    pass
+
+async def _read_body(receive) -> Optional[bytes]:
+    """Buffer the request body, or return None once it exceeds MAX_BODY_BYTES."""
+    body = bytearray()
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise _ClientDisconnect()
+        body.extend(message.get("body", b""))
+        if len(body) > MAX_BODY_BYTES:
+            return None
+        more_body = message.get("more_body", False)
+    return bytes(body)
+
+def _replay(body: bytes, receive):
+    sent = False
+
+    async def replay_receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Later calls (disconnect detection, streaming) see the real connection
+        return await receive()
+
+    return replay_receive
+
+def _body_value(body: bytes, field: str) -> Optional[str]:
+    try:
+        value = json.loads(body).get(field)
+    except (ValueError, AttributeError):
+        return None
+    return value if isinstance(value, str) and value else None
+
+class RateLimitMiddleware:
+    def __init__(
+        self,
+        app,
+        route_classes=None,
+        store: Optional[BucketStore] = None,
+        principal_func: Optional[Callable[[Request], Optional[str]]] = None,
+    ):
+        self.app = app
+        self.route_classes = route_classes if route_classes is not None else DEFAULT_ROUTE_CLASSES
+        self.store = store or InMemoryBucketStore()
+        self.principal_func = principal_func
+        self._admission = {rc.name: _Admission(rc) for rc in self.route_classes}
+
+    def classify(self, path: str) -> Optional[RouteClass]:
+        for route_class in self.route_classes:
+            if path.startswith(route_class.prefixes):
+                return route_class
+        return None
+
+    async def __call__(self, scope, receive, send):
+        route_class = self.classify(scope["path"]) if scope["type"] == "http" else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        name, ip = route_class.name, client_ip(request)
+        limits = [(f"{name}:ip:{ip}", route_class.rate, route_class.burst)]
+        principal = self.principal_func(request) if self.principal_func else None
+        if principal:
+            limits.append((f"{name}:user:{principal}", route_class.rate, route_class.burst))
+        if route_class.body_field and route_class.field_burst:
+            try:
+                body = await _read_body(receive)
+            except _ClientDisconnect:
+                return
+            if body is None:
+                response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+                await response(scope, receive, send)
+                return
+            receive = _replay(body, receive)
+            value = _body_value(body, route_class.body_field)
+            if value:
+                limits.append((f"{name}:{route_class.body_field}:{value}",
+                               route_class.field_rate, route_class.field_burst))
+
+        wait = await self.store.consume(limits)
+        if wait > 0:
+            await too_many_requests(wait, "Rate limit exceeded")(scope, receive, send)
+            return
+
+        admission = self._admission[route_class.name]
+        if not await admission.acquire():
+            response = too_many_requests(route_class.queue_timeout, "Server busy, try again later")
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
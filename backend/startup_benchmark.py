@@ -0,0 +1,75 @@
+"""Startup-time benchmark for the API.
+
+Imports the app module in a fresh interpreter several times and fails if the
+median import time exceeds the budget, or if any heavy analytics dependency
+was pulled in at import time.
+
+Usage:
+    python backend/startup_benchmark.py
+    python backend/startup_benchmark.py --module react_backend --budget 0.4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULE = "backend.main"
+DEFAULT_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "0.5"))
+DEFAULT_RUNS = 5
+
+# Analytics dependencies that must never be imported at startup
+HEAVY_MODULES = ["pandas", "sklearn", "statsmodels"]
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+"""
+
+def measure(module: str) -> dict:
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Failed to import {module}:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="maximum median import time in seconds")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args()
+
+    samples = [measure(args.module) for _ in range(args.runs)]
+    timings = [sample["elapsed"] for sample in samples]
+    heavy = sorted({name for sample in samples for name in sample["heavy"]})
+    median = statistics.median(timings)
+
+    print(f"{args.module}: median {median * 1000:.1f} ms over {args.runs} runs "
+          f"(min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms, "
+          f"budget {args.budget * 1000:.0f} ms)")
+
+    failed = False
+    if median > args.budget:
+        print("FAIL: import time exceeds budget")
+        failed = True
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from backend.rate_limit import (
+    DEFAULT_ROUTE_CLASSES,
+    MAX_BODY_BYTES,
+    BucketStore,
+    InMemoryBucketStore,
+    RateLimitMiddleware,
+    RouteClass,
+    _Admission,
+    _replay,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_app(route_classes, store=None):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, route_classes=route_classes, store=store)
+
+    @app.post("/auth/login")
+    async def login(body: dict):
+        if body.get("password") != "secret":
+            return JSONResponse(status_code=401, content={"detail": "Incorrect username or password"})
+        return {"username": body.get("username")}
+
+    @app.get("/analytics/slow")
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {}
+
+    @app.get("/tasks")
+    async def tasks():
+        return []
+
+    return app
+
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    store = InMemoryBucketStore(clock=clock)
+    consume = lambda: asyncio.run(store.consume([("k", 0.5, 2)]))
+
+    assert consume() == 0
+    assert consume() == 0
+    assert consume() == 2.0  # empty bucket, one token every 2s
+
+    clock.now = 2.0
+    assert consume() == 0
+    assert consume() == 2.0
+
+
+def test_rejected_request_charges_no_bucket():
+    store = InMemoryBucketStore(clock=FakeClock())
+    asyncio.run(store.consume([("user:a", 1.0, 1)]))
+
+    # user:a is empty, so the shared IP bucket must stay untouched
+    assert asyncio.run(store.consume([("ip:nat", 1.0, 1), ("user:a", 1.0, 1)])) > 0
+    assert asyncio.run(store.consume([("ip:nat", 1.0, 1), ("user:b", 1.0, 1)])) == 0
+
+
+def test_eviction_drops_least_recently_used_bucket():
+    store = InMemoryBucketStore(max_keys=2, clock=FakeClock())
+    for key in ["a", "b", "a", "c"]:
+        asyncio.run(store.consume([(key, 1.0, 5)]))
+
+    assert list(store._buckets) == ["a", "c"]
+
+
+def test_rate_limited_response_has_retry_after():
+    route = RouteClass(name="login", prefixes=("/auth/login",), rate=0.2, burst=2,
+                       max_concurrency=4, max_queue=4)
+    client = TestClient(make_app([route]))
+
+    statuses = [client.post("/auth/login", json={}).status_code for _ in range(3)]
+
+    assert statuses == [401, 401, 429]
+    response = client.post("/auth/login", json={})
+    assert response.headers["retry-after"] == "5"
+
+
+def test_failed_logins_from_one_ip_do_not_lock_out_account():
+    app = make_app(DEFAULT_ROUTE_CLASSES)
+    attacker = TestClient(app, client=("6.6.6.6", 1000))
+
+    statuses = [attacker.post("/auth/login", json={"username": "admin", "password": "x"}).status_code
+                for _ in range(6)]
+    assert statuses[-1] == 429
+
+    for ip in ["10.0.0.1", "10.0.0.2", "10.0.0.3"]:
+        client = TestClient(app, client=(ip, 1000))
+        response = client.post("/auth/login", json={"username": "admin", "password": "secret"})
+        assert response.status_code == 200
+
+
+def test_login_is_limited_per_username_across_ips():
+    route = RouteClass(name="login", prefixes=("/auth/login",), rate=0.1, burst=5,
+                       max_concurrency=4, max_queue=4,
+                       body_field="username", field_rate=0.1, field_burst=2)
+    app = make_app([route])
+    clients = [TestClient(app, client=(f"10.0.0.{i}", 1000)) for i in range(3)]
+
+    statuses = [c.post("/auth/login", json={"username": "admin"}).status_code for c in clients]
+
+    assert statuses == [401, 401, 429]
+    assert clients[2].post("/auth/login", json={"username": "staff"}).status_code == 401
+
+
+def test_oversized_body_is_rejected_without_buffering_it_all():
+    received = []
+
+    async def receive():
+        received.append(1)
+        return {"type": "http.request", "body": b"x" * 1024, "more_body": True}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    route = RouteClass(name="login", prefixes=("/auth/login",), rate=1, burst=1,
+                       max_concurrency=1, max_queue=1,
+                       body_field="username", field_rate=1, field_burst=1)
+    middleware = RateLimitMiddleware(make_app([]), route_classes=[route])
+    scope = {"type": "http", "method": "POST", "path": "/auth/login", "headers": [],
+             "client": ("10.0.0.1", 1000)}
+
+    asyncio.run(middleware(scope, receive, send))
+
+    assert sent[0]["status"] == 413
+    assert len(received) == MAX_BODY_BYTES // 1024 + 1
+
+
+def test_replay_delegates_to_original_receive_after_body():
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    replay = _replay(b"payload", receive)
+
+    async def run():
+        first = await replay()
+        second = await replay()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["body"] == b"payload"
+    assert second["type"] == "http.request"
+
+
+def test_bucket_store_requires_consume():
+    class IncompleteStore(BucketStore):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteStore()
+
+
+def test_unclassified_routes_bypass_limiter():
+    class RecordingStore(InMemoryBucketStore):
+        def __init__(self):
+            super().__init__()
+            self.calls = 0
+
+        async def consume(self, limits):
+            self.calls += 1
+            return await super().consume(limits)
+
+    store = RecordingStore()
+    route = RouteClass(name="analytics", prefixes=("/analytics",), rate=0.1, burst=1,
+                       max_concurrency=1, max_queue=0)
+    client = TestClient(make_app([route], store=store))
+
+    assert all(client.get("/tasks").status_code == 200 for _ in range(20))
+    assert store.calls == 0
+
+
+def test_requests_are_shed_once_queue_is_full():
+    route = RouteClass(name="analytics", prefixes=("/analytics",), rate=100, burst=100,
+                       max_concurrency=1, max_queue=1)
+    app = make_app([route])
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[client.get("/analytics/slow") for _ in range(4)])
+
+    responses = asyncio.run(run())
+
+    assert sorted(r.status_code for r in responses) == [200, 200, 429, 429]
+    shed = [r for r in responses if r.status_code == 429]
+    assert all(r.headers["retry-after"] == "5" for r in shed)
+
+
+def test_admission_rejects_when_queue_is_full():
+    admission = _Admission(RouteClass(name="x", prefixes=("/x",), rate=1, burst=1,
+                                      max_concurrency=1, max_queue=1))
+
+    async def run():
+        assert await admission.acquire()
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.waiting == 1
+        assert not await admission.acquire()
+        admission.release()
+        assert await waiter
+        assert admission.waiting == 0
+
+    asyncio.run(run())
+
+
+def test_admission_waiter_times_out():
+    admission = _Admission(RouteClass(name="x", prefixes=("/x",), rate=1, burst=1,
+                                      max_concurrency=1, max_queue=2, queue_timeout=0.05))
+
+    async def run():
+        assert await admission.acquire()
+        assert not await admission.acquire()
+        assert admission.waiting == 0
+        admission.release()
+        assert await admission.acquire()
+
+    asyncio.run(run())
+
+
+def test_rate_limited_response_keeps_cors_headers():
+    route = RouteClass(name="login", prefixes=("/auth/login",), rate=0.1, burst=1,
+                       max_concurrency=4, max_queue=4)
+    app = make_app([route])
+    # Same order as backend.main: CORS added last, so it wraps the limiter
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
+                       allow_methods=["*"], allow_headers=["*"])
+    client = TestClient(app)
+    headers = {"Origin": "http://localhost:3000"}
+
+    responses = [client.post("/auth/login", json={}, headers=headers) for _ in range(2)]
+
+    assert responses[-1].status_code == 429
+    assert responses[-1].headers["access-control-allow-origin"] == "http://localhost:3000"
+
+
+def test_backend_wraps_limiter_in_cors():
+    from backend.main import app
+
+    classes = [middleware.cls for middleware in app.user_middleware]
+    # user_middleware is outermost first
+    assert classes.index(CORSMiddleware) < classes.index(RateLimitMiddleware)
@@ -0,0 +1,10 @@
+import statistics
+
+from backend.startup_benchmark import DEFAULT_BUDGET_SECONDS, measure
+
+
+def test_backend_imports_within_budget_without_heavy_modules():
+    samples = [measure("backend.main") for _ in range(3)]
+
+    assert [sample["heavy"] for sample in samples] == [[], [], []]
+    assert statistics.median(sample["elapsed"] for sample in samples) < DEFAULT_BUDGET_SECONDS